@@ -9,6 +9,10 @@ import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 from functools import wraps
+from collections import OrderedDict
+import hashlib
+import threading
+import time
 from dotenv import load_dotenv
 from flask_cors import CORS
 from PIL import Image
@@ -25,6 +29,7 @@ CORS(app)
 app.config['JWT_SECRET'] = os.getenv('JWT_SECRET', 'your-secret-key')
 app.config['JWT_EXPIRATION_MINUTES'] = int(os.getenv('JWT_EXPIRATION_MINUTES', '15'))  # Default 15 minutes
 app.config['JWT_REFRESH_EXPIRATION_DAYS'] = int(os.getenv('JWT_REFRESH_EXPIRATION_DAYS', '7'))  # Default 7 days
+app.config['JWT_CACHE_SIZE'] = int(os.getenv('JWT_CACHE_SIZE', '1024'))  # Verified tokens kept in memory, 0 disables
 
 # AWS Configuration
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -106,6 +111,80 @@ def handle_generic_exception(e):
         "message": "Internal server error"
     }), 500
 
+# Verified-token cache so polling clients don't pay for a full JWT decode on every request.
+# Entries are keyed by a digest of the token and dropped once the token's exp passes.
+_token_cache = OrderedDict()  # digest -> decoded payload, least recently used first
+_revoked_tokens = {}  # digest -> exp, kept until the token would have expired anyway
+_token_cache_lock = threading.Lock()
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def revoke_token(token):
+    """Deny a token for the rest of its lifetime, even if it is already cached; raises jwt.InvalidTokenError"""
+    # Expired tokens can still be revoked, but only genuine ones with a numeric exp
+    data = jwt.decode(
+        token,
+        app.config['JWT_SECRET'],
+        algorithms=['HS256'],
+        options={
+            'verify_exp': False,
+            'require': ['exp']
+        }
+    )
+    exp = data['exp']
+    if isinstance(exp, bool) or not isinstance(exp, (int, float)):
+        raise jwt.InvalidTokenError('Expiration Time claim (exp) must be a number')
+    digest = _token_digest(token)
+    now = time.time()
+    with _token_cache_lock:
+        # Forget revocations for tokens that have expired on their own
+        for expired in [d for d, revoked_exp in _revoked_tokens.items() if revoked_exp <= now]:
+            del _revoked_tokens[expired]
+        _token_cache.pop(digest, None)
+        _revoked_tokens[digest] = exp
+
+def verify_token(token):
+    """Return the token's payload, using the cache when possible; raises jwt.InvalidTokenError"""
+    digest = _token_digest(token)
+    now = time.time()
+    with _token_cache_lock:
+        # Revocation is checked in the same lookup as the cache
+        if digest in _revoked_tokens:
+            if _revoked_tokens[digest] > now:
+                raise jwt.InvalidTokenError('Token has been revoked')
+            del _revoked_tokens[digest]
+        data = _token_cache.get(digest)
+        if data is not None:
+            if data['exp'] > now:
+                _token_cache.move_to_end(digest)
+                return data
+            # Expired: fall through so jwt.decode raises ExpiredSignatureError
+            del _token_cache[digest]
+
+    data = jwt.decode(
+        token, 
+        app.config['JWT_SECRET'], 
+        algorithms=['HS256'],
+        options={
+            'verify_exp': True,
+            'verify_iat': True,
+            'require': ['exp', 'iat', 'user_id']
+        }
+    )
+
+    # PyJWT accepts any exp int() can parse; only cache tokens whose exp compares as a number
+    exp = data['exp']
+    max_size = app.config['JWT_CACHE_SIZE']
+    if max_size > 0 and isinstance(exp, (int, float)) and not isinstance(exp, bool):
+        with _token_cache_lock:
+            if digest not in _revoked_tokens:
+                _token_cache[digest] = data
+                _token_cache.move_to_end(digest)
+                while len(_token_cache) > max_size:
+                    _token_cache.popitem(last=False)
+    return data
+
 # JWT token verification decorator with improved error messages
 def token_required(f):
     @wraps(f)
@@ -128,16 +207,7 @@ def token_required(f):
 
             token = parts[1]
             
-            data = jwt.decode(
-                token, 
-                app.config['JWT_SECRET'], 
-                algorithms=['HS256'],
-                options={
-                    'verify_exp': True,
-                    'verify_iat': True,
-                    'require': ['exp', 'iat', 'user_id']
-                }
-            )
+            data = verify_token(token)
             
             # Instead of adding current_user_id as a parameter, add it to kwargs
             kwargs['current_user_id'] = data['user_id']
@@ -178,6 +248,16 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    # Files already imported by import_photos.py, written in the same transaction as their photos
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            user_id INTEGER NOT NULL,
+            source_root TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            PRIMARY KEY (user_id, source_root, rel_path),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
     conn.commit()
     conn.close()
 
@@ -348,7 +428,7 @@ class PhotoDetail(Resource):
             c = conn.cursor()
             
             # First get the URLs to know what to delete from S3
-            c.execute('SELECT s3_url, thumbnail_url FROM photos WHERE filename = ? AND user_id = ?', 
+            c.execute('SELECT id, s3_url, thumbnail_url FROM photos WHERE filename = ? AND user_id = ?', 
                      (filename, current_user_id))
             result = c.fetchone()
             
@@ -358,10 +438,10 @@ class PhotoDetail(Resource):
                     "message": "Photo not found or unauthorized"
                 }, 404
 
-            # Extract keys from URLs
-            s3_url, thumbnail_url = result
-            original_key = f"originals/{filename}"
-            thumbnail_key = f"thumbnails/{filename}"
+            # Extract keys from URLs (bulk-imported photos aren't stored under their filename)
+            photo_id, s3_url, thumbnail_url = result
+            original_key = object_key_from_url(s3_url)
+            thumbnail_key = object_key_from_url(thumbnail_url)
 
             # Delete from S3
             try:
@@ -371,8 +451,7 @@ class PhotoDetail(Resource):
                 app.logger.error(f"S3 deletion error: {str(e)}")
 
             # Delete from database
-            c.execute('DELETE FROM photos WHERE filename = ? AND user_id = ?', 
-                     (filename, current_user_id))
+            c.execute('DELETE FROM photos WHERE id = ?', (photo_id,))
             conn.commit()
             conn.close()
             
@@ -525,6 +604,48 @@ def api_docs():
 # Initialize database on startup
 init_db()
 
+# Image processing shared by the upload endpoint and the bulk importer
+def process_image(fp):
+    """Encode an image as a full-resolution original and an 800px thumbnail (JPEG buffers)"""
+    # Load the original image
+    image = Image.open(fp)
+    
+    # Convert to RGB if needed (for PNG/HEIC support)
+    if image.mode in ('RGBA', 'P'):
+        image = image.convert('RGB')
+    
+    # Save original at full resolution and high quality
+    original_buffer = BytesIO()
+    image.save(original_buffer, format='JPEG', quality=95)  # High quality for original
+    original_buffer.seek(0)
+    
+    # Create and save thumbnail separately
+    thumbnail = image.copy()  # Make a copy for thumbnail
+    thumbnail_size = (800, 800)  # Increased from 300x300
+    thumbnail.thumbnail(thumbnail_size)
+    thumbnail_buffer = BytesIO()
+    thumbnail.save(thumbnail_buffer, format='JPEG', quality=90)  # Increased from 85
+    thumbnail_buffer.seek(0)
+    
+    return original_buffer, thumbnail_buffer
+
+def upload_photo_objects(filename, original_buffer, thumbnail_buffer):
+    """Upload an encoded original and thumbnail to S3 and return their URLs"""
+    original_key = f"originals/{filename}"
+    thumbnail_key = f"thumbnails/{filename}"
+    
+    s3_client.upload_fileobj(original_buffer, BUCKET_NAME, original_key)
+    s3_client.upload_fileobj(thumbnail_buffer, BUCKET_NAME, thumbnail_key)
+    
+    # Get S3 URLs
+    original_url = f"https://{BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{original_key}"
+    thumbnail_url = f"https://{BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{thumbnail_key}"
+    return original_url, thumbnail_url
+
+def object_key_from_url(url):
+    """Return the S3 key for a URL built by upload_photo_objects"""
+    return url.split('.amazonaws.com/', 1)[-1]
+
 @app.route('/api/v1/upload', methods=['POST'])
 @token_required
 def upload_file(current_user_id):
@@ -545,36 +666,8 @@ def upload_file(current_user_id):
         # Secure the filename
         filename = secure_filename(file.filename)
         
-        # Load the original image
-        image = Image.open(file)
-        
-        # Convert to RGB if needed (for PNG/HEIC support)
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert('RGB')
-        
-        # Save original at full resolution and high quality
-        original_buffer = BytesIO()
-        image.save(original_buffer, format='JPEG', quality=95)  # High quality for original
-        original_buffer.seek(0)
-        
-        # Create and save thumbnail separately
-        thumbnail = image.copy()  # Make a copy for thumbnail
-        thumbnail_size = (800, 800)  # Increased from 300x300
-        thumbnail.thumbnail(thumbnail_size)
-        thumbnail_buffer = BytesIO()
-        thumbnail.save(thumbnail_buffer, format='JPEG', quality=90)  # Increased from 85
-        thumbnail_buffer.seek(0)
-        
-        # Upload to S3
-        original_key = f"originals/{filename}"
-        thumbnail_key = f"thumbnails/{filename}"
-        
-        s3_client.upload_fileobj(original_buffer, BUCKET_NAME, original_key)
-        s3_client.upload_fileobj(thumbnail_buffer, BUCKET_NAME, thumbnail_key)
-        
-        # Get S3 URLs
-        original_url = f"https://{BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{original_key}"
-        thumbnail_url = f"https://{BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{thumbnail_key}"
+        original_buffer, thumbnail_buffer = process_image(file)
+        original_url, thumbnail_url = upload_photo_objects(filename, original_buffer, thumbnail_buffer)
         
         # Save to database
         conn = sqlite3.connect('database.db')
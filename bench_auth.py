@@ -0,0 +1,46 @@
+from app import app, token_required, _token_cache
+import argparse
+import jwt
+import time
+from datetime import datetime, timedelta
+
+@token_required
+def protected(current_user_id):
+    return current_user_id
+
+def make_token(user_id=1):
+    return jwt.encode({
+        'user_id': user_id,
+        'iat': datetime.utcnow(),
+        'exp': datetime.utcnow() + timedelta(minutes=app.config['JWT_EXPIRATION_MINUTES'])
+    }, app.config['JWT_SECRET'])
+
+def time_auth(token, iterations, cache_size):
+    """Average seconds spent in token_required per request for the given cache size"""
+    app.config['JWT_CACHE_SIZE'] = cache_size
+    _token_cache.clear()
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.test_request_context('/api/v1/photos', headers=headers):
+        protected()  # Warm up (and populate the cache when enabled)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            protected()
+        return (time.perf_counter() - start) / iterations
+
+def run_benchmark(iterations):
+    token = make_token()
+    cache_size = app.config['JWT_CACHE_SIZE'] or 1024
+    uncached = time_auth(token, iterations, 0)
+    cached = time_auth(token, iterations, cache_size)
+    app.config['JWT_CACHE_SIZE'] = cache_size
+
+    print(f"Auth overhead over {iterations} requests:")
+    print(f"  without cache: {uncached * 1e6:8.2f} us/request")
+    print(f"  with cache:    {cached * 1e6:8.2f} us/request")
+    print(f"  speedup:       {uncached / cached:8.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark per-request JWT auth overhead')
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    run_benchmark(args.iterations)
@@ -0,0 +1,166 @@
+from app import app, process_image, upload_photo_objects
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from io import BytesIO
+from werkzeug.utils import secure_filename
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+
+def iter_images(root):
+    """Yield paths of image files under root, relative to root, in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(dirpath, name), root)
+
+def load_checkpoints(conn, user_id, root):
+    """Return the set of relative paths under root already imported for this owner"""
+    c = conn.cursor()
+    c.execute('SELECT rel_path FROM import_checkpoints WHERE user_id = ? AND source_root = ?',
+              (user_id, root))
+    return {row[0] for row in c.fetchall()}
+
+def photo_filename(user_id, root, rel_path):
+    """Unique, secured value for photos.filename: <digest>_<secured basename>
+
+    The digest keeps files from different folders, owners and archives apart, so every
+    imported row can be addressed on its own through /photos/<filename>.
+    """
+    digest = hashlib.sha256(f"{user_id}:{root}:{rel_path}".encode('utf-8')).hexdigest()[:16]
+    return f"{digest}_{secure_filename(os.path.basename(rel_path)) or 'photo.jpg'}"
+
+def encode_file(root, rel_path):
+    """Process pool worker: encode one file the same way the upload endpoint does"""
+    original_buffer, thumbnail_buffer = process_image(os.path.join(root, rel_path))
+    return original_buffer.getvalue(), thumbnail_buffer.getvalue()
+
+def upload_encoded(filename, original_bytes, thumbnail_bytes):
+    """Upload pool worker: push both objects to S3 and return their URLs
+
+    Objects go to originals/imports/<filename> and thumbnails/imports/<filename>, out of the
+    way of the names upload_file produces (which never contain '/').
+    """
+    return upload_photo_objects(f"imports/{filename}", BytesIO(original_bytes), BytesIO(thumbnail_bytes))
+
+def get_user_id(conn, username):
+    c = conn.cursor()
+    c.execute('SELECT id FROM users WHERE username = ?', (username,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+def import_directory(root, user_id, workers, upload_concurrency, batch_size):
+    conn = sqlite3.connect('database.db')
+    c = conn.cursor()
+
+    done = load_checkpoints(conn, user_id, root)
+    if done:
+        print(f"Resuming: {len(done)} files already imported for this owner")
+    c.execute('SELECT COUNT(*) FROM import_checkpoints WHERE source_root = ? AND user_id != ?',
+              (root, user_id))
+    if c.fetchone()[0]:
+        print(f"Note: {root} was previously imported for a different owner")
+
+    pending = (rel_path for rel_path in iter_images(root) if rel_path not in done)
+
+    rows = []
+    imported = 0
+    failed = 0
+
+    # Cap the number of files in flight so encoded images never pile up in memory
+    window = 2 * max(workers, upload_concurrency)
+    in_flight = {}  # future -> (stage, rel_path, filename)
+
+    def flush():
+        # Insert a batch of rows and checkpoint the files they came from in one transaction
+        nonlocal imported
+        if not rows:
+            return
+        c.executemany('''
+            INSERT INTO photos (filename, s3_url, thumbnail_url, user_id, upload_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [row for _, row in rows])
+        c.executemany('''
+            INSERT INTO import_checkpoints (user_id, source_root, rel_path)
+            VALUES (?, ?, ?)
+        ''', [(user_id, root, rel_path) for rel_path, _ in rows])
+        conn.commit()
+        imported += len(rows)
+        print(f"Committed {imported} photos")
+        rows.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as encoders, \
+            ThreadPoolExecutor(max_workers=upload_concurrency) as uploaders:
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < window:
+                rel_path = next(pending, None)
+                if rel_path is None:
+                    exhausted = True
+                    break
+                filename = photo_filename(user_id, root, rel_path)
+                future = encoders.submit(encode_file, root, rel_path)
+                in_flight[future] = ('encode', rel_path, filename)
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, rel_path, filename = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing {rel_path}: {str(e)}")
+                    failed += 1
+                    continue
+
+                if stage == 'encode':
+                    upload = uploaders.submit(upload_encoded, filename, *result)
+                    in_flight[upload] = ('upload', rel_path, filename)
+                else:
+                    original_url, thumbnail_url = result
+                    rows.append((rel_path, (filename, original_url, thumbnail_url, user_id, datetime.utcnow())))
+                    if len(rows) >= batch_size:
+                        flush()
+
+        flush()
+
+    conn.close()
+    print(f"Import complete! {imported} imported, {failed} failed")
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import a local photo directory into Musefuse')
+    parser.add_argument('directory', help='Root directory to scan for images')
+    parser.add_argument('--owner', required=True, help='Username that will own the imported photos')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Image encoding processes')
+    parser.add_argument('--upload-concurrency', type=int, default=8, help='Concurrent S3 uploads')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows inserted per database transaction')
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.directory)
+    if not os.path.isdir(root):
+        parser.error(f"{args.directory} is not a directory")
+    for option in ('workers', 'upload_concurrency', 'batch_size'):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+
+    conn = sqlite3.connect('database.db')
+    user_id = get_user_id(conn, args.owner)
+    conn.close()
+    if user_id is None:
+        parser.error(f"User {args.owner} does not exist")
+
+    failed = import_directory(root, user_id, args.workers,
+                              args.upload_concurrency, args.batch_size)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    with app.app_context():
+        sys.exit(main())